@@ -1,68 +1,143 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os, json, math, argparse, datetime as dt, time, socket, threading
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import os, json, math, argparse, datetime as dt, time, socket, threading, queue, functools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import sounddevice as sd
 import soundfile as sf
-from scipy.signal import butter, sosfilt
+from scipy.signal import butter, sosfilt, firwin, lfilter
+from scipy.special import logsumexp
 import paho.mqtt.client as mqtt
 
+# orjson serializes/deserializes several times faster than the stdlib and is
+# used on the hot paths (MQTT payloads, SSE snapshots, API responses) when
+# available; the add-on works unchanged without it.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 # ---------- Konstanten ----------
 FCS_LOW  = [40,50,63,80,100,125,160,200,250,315]  # Trigger & CSV (will be dynamically replaced)
 FCS_FULL = [31.5,40,50,63,80,100,125,160,200,250,315,400,500,630,800,1000,1250,1600,2000,2500,3150,4000,5000,6300,8000,10000,12500,16000,20000]  # Spektrum (will be dynamically replaced)
 K = 2 ** (1/6)
+INV_PREF = 1.0 / 20e-6  # 1 / p0 (reference sound pressure 20 uPa)
+LN10_10 = math.log(10) / 10  # dB <-> natural-log scale factor
+# Diagnostic prints in the per-block path are opt-in: set WP_DEBUG=1 in the
+# add-on environment. Each print formats its arguments even when the output
+# goes nowhere, so they are not free on a Pi-class host.
+DEBUG = os.environ.get("WP_DEBUG", "0") not in ("0", "", "false")
+
+# Canonical center-frequency tables, built once at import; the sorted float
+# copies exist so the min/max cut is a pair of binary searches instead of a
+# per-frequency comparison scan.
+_OCTAVE_BANDS = {
+    "1octave": [31.5, 63, 125, 250, 500, 1000, 2000, 4000, 8000, 16000],
+    "2octave": [31.5, 44.7, 63, 89.1, 125, 177, 250, 354, 500, 707, 1000, 1414, 2000, 2828, 4000, 5657, 8000, 11314, 16000],
+    "3octave": [31.5, 40, 50, 63, 80, 100, 125, 160, 200, 250, 315, 400, 500, 630, 800, 1000, 1250, 1600, 2000, 2500, 3150, 4000, 5000, 6300, 8000, 10000, 12500, 16000, 20000],
+}
+_OCTAVE_BANDS_ARR = {k: np.asarray(v, dtype=float) for k, v in _OCTAVE_BANDS.items()}
 
 def get_octave_bands(band_type, min_freq=31.5, max_freq=20000):
     """Generate octave band center frequencies based on band type."""
-    if band_type == "1octave":
-        # 1-octave bands: 31.5, 63, 125, 250, 500, 1000, 2000, 4000, 8000, 16000
-        base_freqs = [31.5, 63, 125, 250, 500, 1000, 2000, 4000, 8000, 16000]
-    elif band_type == "2octave":
-        # 1/2-octave bands
-        base_freqs = [31.5, 44.7, 63, 89.1, 125, 177, 250, 354, 500, 707, 1000, 1414, 2000, 2828, 4000, 5657, 8000, 11314, 16000]
-    else:  # "3octave" or default
-        # 1/3-octave bands (full range)
-        base_freqs = [31.5, 40, 50, 63, 80, 100, 125, 160, 200, 250, 315, 400, 500, 630, 800, 1000, 1250, 1600, 2000, 2500, 3150, 4000, 5000, 6300, 8000, 10000, 12500, 16000, 20000]
-    
-    # Filter by min/max frequency
-    return [f for f in base_freqs if min_freq <= f <= max_freq]
+    key = band_type if band_type in _OCTAVE_BANDS else "3octave"
+    arr = _OCTAVE_BANDS_ARR[key]
+    lo = int(np.searchsorted(arr, min_freq, side="left"))
+    hi = int(np.searchsorted(arr, max_freq, side="right"))
+    # Slice the canonical list so callers keep the original int/float mix
+    # (band labels distinguish "40" from "40.0").
+    return _OCTAVE_BANDS[key][lo:hi]
 
+@functools.lru_cache(maxsize=None)
 def band_sos(fc, fs, order=4):
+    # Cached: butter() runs a full analog-prototype design each call, and the
+    # bank is rebuilt with identical arguments when the stream falls back to
+    # another sample rate and again recovers.
     lo = (fc / K) / (fs/2)
     hi = (fc * K) / (fs/2)
     return butter(order, [lo, hi], btype='bandpass', output='sos')
 
+# IEC 61672 weighting pole frequencies, squared once at import.
+_W1 = 20.6**2
+_W2 = 107.7**2
+_W3 = 737.9**2
+_W4 = 12194**2
+
 def a_corr(fc: float) -> float:
     f=float(fc); f2=f*f
-    num=(12194**2)*(f2**2)
-    den=(f2+20.6**2)*((f2+107.7**2)**0.5)*((f2+737.9**2)**0.5)*(f2+12194**2)
+    num=_W4*(f2*f2)
+    den=(f2+_W1)*math.sqrt(f2+_W2)*math.sqrt(f2+_W3)*(f2+_W4)
     return 20*math.log10(num/den)+2.0  # +2 dB ≈ IEC-Rundungskorrektur
 
 def c_corr(fc: float) -> float:
     f=float(fc); f2=f*f
-    num=(12194**2)*(f2)
-    den=(f2+20.6**2)*(f2+12194**2)
+    num=_W4*f2
+    den=(f2+_W1)*(f2+_W4)
     return 20*math.log10(num/den)+0.06  # C-weighting correction
 
+def a_corr_arr(fcs) -> np.ndarray:
+    """Vectorized a_corr over an array of center frequencies."""
+    f2 = np.asarray(fcs, dtype=float)**2
+    num = _W4*(f2**2)
+    den = (f2+_W1)*np.sqrt(f2+_W2)*np.sqrt(f2+_W3)*(f2+_W4)
+    return 20*np.log10(num/den)+2.0
+
+def c_corr_arr(fcs) -> np.ndarray:
+    """Vectorized c_corr over an array of center frequencies."""
+    f2 = np.asarray(fcs, dtype=float)**2
+    num = _W4*f2
+    den = (f2+_W1)*(f2+_W4)
+    return 20*np.log10(num/den)+0.06
+
+# Hot-path logging: print() writes synchronously to the container's stdout
+# pipe and can stall the audio loop if the consumer is slow. log() hands the
+# line to an unbounded SimpleQueue (put never blocks) and a drain thread does
+# the actual writing.
+_log_q = queue.SimpleQueue()
+
+def log(msg):
+    _log_q.put(msg)
+
+def _log_drain():
+    while True:
+        print(_log_q.get(), flush=True)
+
+threading.Thread(target=_log_drain, daemon=True).start()
+
 def now_utc() -> str:
     return dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H-%M-%SZ")
 
+def _to_float(v):
+    """Coerce a calibration value to float. Numbers pass straight through;
+    only strings take the replace() path that accepts a decimal comma."""
+    if isinstance(v, (int, float)):
+        return float(v)
+    return float(str(v).replace(",", "."))
+
 def load_cal(path):
     off=0.0; band={}
     try:
-        with open(path) as f:
-            d=json.load(f)
-        off=float(str(d.get("offset_db",0.0)).replace(",","."))
+        with open(path, "rb") as f:
+            d=_loads(f.read())
+        off=_to_float(d.get("offset_db",0.0))
         # Preserve decimal center frequencies (e.g., 31.5 Hz)
         band = {}
         for k, v in d.get("band_corr_db", {}).items():
             try:
-                kf = float(str(k).replace(",","."))
-                vf = float(str(v).replace(",","."))
-                band[kf] = vf
+                band[_to_float(k)] = _to_float(v)
             except Exception:
                 print(f"[wp-audio] WARNING: invalid calibration entry {k}={v}: ignored (must be a number, dot or comma allowed)")
         print(f"[wp-audio] Kalibrierung: offset_db={off} band_corr={band}")
@@ -82,8 +157,47 @@ def device_info():
 
 # ----------- Mini-Web-UI (Ingress) -----------
 latest_payload = {"bands": [], "values": [], "weighting": "Z", "ts": now_utc(), "la80": None, "la160": None}
+
+# SSE: connected clients register their wfile here; one broadcaster thread
+# pushes each payload update to all of them instead of every connection
+# running its own ping loop.
+sse_clients = {}  # wfile -> threading.Event set when the client is dropped
+sse_lock = threading.Lock()
+sse_wakeup = threading.Event()
+latest_payload_bytes = _dumps(latest_payload)
+
+def publish_snapshot(d, notify=True):
+    """Update latest_payload and its cached serialized form in one place.
+
+    The payload is serialized once here, not once per SSE client / HTTP
+    request that reads it.
+    """
+    global latest_payload_bytes
+    latest_payload.update(d)
+    latest_payload_bytes = _dumps(latest_payload)
+    if notify:
+        sse_wakeup.set()
+
+def sse_broadcaster():
+    while True:
+        sse_wakeup.wait()
+        sse_wakeup.clear()
+        data = b"data: " + latest_payload_bytes + b"\n\n"
+        with sse_lock:
+            clients = list(sse_clients.items())
+        for wf, closed in clients:
+            try:
+                wf.write(data)
+                wf.flush()
+            except Exception:
+                with sse_lock:
+                    sse_clients.pop(wf, None)
+                closed.set()
 trigger_config = {"triggers": []}  # Will be populated from args
 analyzer_config = {}  # Will be populated in main()
+# Bumped whenever a POST handler changes analyzer_config at runtime; the
+# audio loop refreshes its cached config-derived locals only when this moves.
+config_version = {"n": 0}
 
 HTML = """<!DOCTYPE html><meta charset=utf-8>
 <title>Sound Analyzer and trigger based Recorder</title>
@@ -466,8 +580,34 @@ function browseFolder(){
   }
 }
 </script>"""
+# Encoded once at import; every GET / serves these bytes directly.
+HTML_BYTES = HTML.encode("utf-8")
+
+# /api/events cache: rescanning the storage dir and re-parsing every
+# event_metadata.json on each poll gets slow once hundreds of events pile
+# up. The directory mtime changes whenever an event dir is added/removed,
+# so the encoded listing can be reused until then; parsed metadata is
+# cached per file keyed on its mtime.
+_events_cache = {"dir": None, "dir_mtime": -1.0, "meta": {}, "payload": b"[]"}
+_events_cache_lock = threading.Lock()
+
+# /api/config responses are served from pre-encoded bytes keyed on the saved
+# config file's mtime; the UI polls this endpoint, and re-reading plus
+# re-encoding the same file per poll is wasted work. A config POST rewrites
+# the file, which moves the mtime and refreshes the cache.
+_config_cache = {"mtime": None, "payload": None}
+_config_cache_lock = threading.Lock()
 
 class H(BaseHTTPRequestHandler):
+    def setup(self):
+        super().setup()
+        # SSE pushes many small writes; without TCP_NODELAY Nagle's
+        # algorithm delays each update by up to an RTT.
+        try:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+
     def log_message(self, format, *args):
         # Log HTTP requests for debugging
         print(f"[wp-audio] HTTP {format % args}", flush=True)
@@ -479,31 +619,55 @@ class H(BaseHTTPRequestHandler):
                 self.send_response(200)
                 self.send_header("Content-Type","text/html; charset=utf-8")
                 self.send_header("Cache-Control","no-store")
+                self.send_header("Content-Length", str(len(HTML_BYTES)))
                 self.end_headers()
-                self.wfile.write(HTML.encode("utf-8"))
+                self.wfile.write(HTML_BYTES)
                 return
             if self.path == "/api/events":
                 # List all recorded events
                 storage_dir = analyzer_config.get("storageLocation", "/media/wp_audio/events")
-                events = []
-                try:
-                    if os.path.exists(storage_dir):
-                        for event_dir in sorted(os.listdir(storage_dir), reverse=True):
-                            event_path = os.path.join(storage_dir, event_dir)
-                            if os.path.isdir(event_path):
-                                metadata_file = os.path.join(event_path, "event_metadata.json")
-                                if os.path.exists(metadata_file):
-                                    with open(metadata_file, "r") as f:
-                                        metadata = json.load(f)
+                with _events_cache_lock:
+                    try:
+                        dir_mtime = os.path.getmtime(storage_dir) if os.path.exists(storage_dir) else -1.0
+                        if (_events_cache["dir"] != storage_dir
+                                or _events_cache["dir_mtime"] != dir_mtime):
+                            events = []
+                            meta_cache = _events_cache["meta"] if _events_cache["dir"] == storage_dir else {}
+                            new_meta = {}
+                            if dir_mtime >= 0:
+                                # scandir reuses the readdir d_type info, so
+                                # is_dir() costs no extra stat per entry.
+                                with os.scandir(storage_dir) as it:
+                                    entries = sorted(it, key=lambda e: e.name, reverse=True)
+                                for entry in entries:
+                                    if entry.is_dir():
+                                        metadata_file = os.path.join(entry.path, "event_metadata.json")
+                                        try:
+                                            meta_mtime = os.path.getmtime(metadata_file)
+                                        except OSError:
+                                            continue
+                                        cached = meta_cache.get(metadata_file)
+                                        if cached is not None and cached[0] == meta_mtime:
+                                            metadata = cached[1]
+                                        else:
+                                            with open(metadata_file, "rb") as f:
+                                                metadata = _loads(f.read())
+                                        new_meta[metadata_file] = (meta_mtime, metadata)
                                         events.append(metadata)
-                except Exception as e:
-                    print(f"[wp-audio] Error listing events: {e}", flush=True)
+                            _events_cache["dir"] = storage_dir
+                            _events_cache["dir_mtime"] = dir_mtime
+                            _events_cache["meta"] = new_meta
+                            _events_cache["payload"] = _dumps(events)
+                    except Exception as e:
+                        print(f"[wp-audio] Error listing events: {e}", flush=True)
+                    payload = _events_cache["payload"]
                 self.send_response(200)
                 self.send_header("Content-Type","application/json")
                 self.send_header("Access-Control-Allow-Origin", "*")
                 self.send_header("Cache-Control","no-store")
+                self.send_header("Content-Length", str(len(payload)))
                 self.end_headers()
-                self.wfile.write(json.dumps(events).encode("utf-8"))
+                self.wfile.write(payload)
                 return
             if self.path.startswith("/api/events/"):
                 # Serve event files: /api/events/{event_id}/{filename}
@@ -524,14 +688,68 @@ class H(BaseHTTPRequestHandler):
                         else:
                             content_type = "application/octet-stream"
                         
-                        self.send_response(200)
+                        file_size = os.path.getsize(file_path)
+                        # Single-range support so the browser audio player
+                        # can seek inside a FLAC without re-downloading it.
+                        start, end, status = 0, file_size - 1, 200
+                        range_header = self.headers.get("Range")
+                        if range_header and range_header.startswith("bytes="):
+                            try:
+                                spec = range_header[6:].split(",")[0].strip()
+                                lo, _, hi = spec.partition("-")
+                                if lo:
+                                    start = int(lo)
+                                    if hi:
+                                        end = min(int(hi), file_size - 1)
+                                elif hi:  # suffix range: the last N bytes
+                                    start = max(file_size - int(hi), 0)
+                                if start > end or start >= file_size:
+                                    self.send_response(416)
+                                    self.send_header("Content-Range", f"bytes */{file_size}")
+                                    self.end_headers()
+                                    return
+                                status = 206
+                            except ValueError:
+                                start, end = 0, file_size - 1
+                        length = end - start + 1
+                        self.send_response(status)
                         self.send_header("Content-Type", content_type)
                         self.send_header("Access-Control-Allow-Origin", "*")
-                        self.send_header("Content-Length", str(os.path.getsize(file_path)))
+                        self.send_header("Accept-Ranges", "bytes")
+                        if status == 206:
+                            self.send_header("Content-Range", f"bytes {start}-{end}/{file_size}")
+                        self.send_header("Content-Length", str(length))
                         self.end_headers()
                         
+                        # Stream the requested span instead of loading it
+                        # whole; sendfile copies in-kernel, the chunked read
+                        # loop is the portable fallback.
                         with open(file_path, "rb") as f:
-                            self.wfile.write(f.read())
+                            offset, remaining = start, length
+                            try:
+                                # sendfile may send fewer bytes than asked
+                                # per call; advance the offset until the span
+                                # is out (a zero return means EOF).
+                                while remaining > 0:
+                                    sent = os.sendfile(self.wfile.fileno(), f.fileno(), offset, remaining)
+                                    if sent == 0:
+                                        break
+                                    offset += sent
+                                    remaining -= sent
+                            except (AttributeError, OSError):
+                                if offset != start:
+                                    # Part of the body is already on the
+                                    # wire; re-sending from the top would
+                                    # corrupt it. Let the connection drop.
+                                    raise
+                                f.seek(start)
+                                while remaining > 0:
+                                    chunk = f.read(min(65536, remaining))
+                                    if not chunk:
+                                        break
+                                    self.wfile.write(chunk)
+                                    remaining -= len(chunk)
+                        self.wfile.flush()
                         return
                 self.send_response(404)
                 self.end_headers()
@@ -541,30 +759,40 @@ class H(BaseHTTPRequestHandler):
                 self.send_header("Content-Type","application/json")
                 self.send_header("Cache-Control","no-store")
                 self.end_headers()
-                self.wfile.write(json.dumps(trigger_config).encode("utf-8"))
+                self.wfile.write(_dumps(trigger_config))
                 return
             if self.path == "/api/config":
+                # Serve saved config (or defaults) from the mtime-keyed cache
+                config_file = "/data/analyzer_config.json"
+                try:
+                    mtime = os.path.getmtime(config_file)
+                except OSError:
+                    mtime = -1.0
+                with _config_cache_lock:
+                    if _config_cache["mtime"] != mtime or _config_cache["payload"] is None:
+                        if mtime >= 0:
+                            with open(config_file, "rb") as f:
+                                payload = f.read()  # file already holds JSON
+                        else:
+                            payload = _dumps({
+                                "bands": "3octave",
+                                "minFreq": 31.5,
+                                "maxFreq": 20000,
+                                "triggers": trigger_config.get("triggers", []),
+                                "logic": "AND",
+                                "storageLocation": "/media/wp_audio/events",
+                                "recLength": 60,
+                                "calibration": {}
+                            })
+                        _config_cache["mtime"] = mtime
+                        _config_cache["payload"] = payload
+                    payload = _config_cache["payload"]
                 self.send_response(200)
                 self.send_header("Content-Type","application/json")
                 self.send_header("Cache-Control","no-store")
+                self.send_header("Content-Length", str(len(payload)))
                 self.end_headers()
-                # Load saved config or return defaults
-                config_file = "/data/analyzer_config.json"
-                if os.path.exists(config_file):
-                    with open(config_file, "r") as f:
-                        config = json.load(f)
-                else:
-                    config = {
-                        "bands": "3octave",
-                        "minFreq": 31.5,
-                        "maxFreq": 20000,
-                        "triggers": trigger_config.get("triggers", []),
-                        "logic": "AND",
-                        "storageLocation": "/media/wp_audio/events",
-                        "recLength": 60,
-                        "calibration": {}
-                    }
-                self.wfile.write(json.dumps(config).encode("utf-8"))
+                self.wfile.write(payload)
                 return
             if self.path.endswith("/sse") or self.path == "/sse":
                 self.send_response(200)
@@ -572,15 +800,16 @@ class H(BaseHTTPRequestHandler):
                 self.send_header("Cache-Control","no-store")
                 self.send_header("Connection","keep-alive")
                 self.end_headers()
-                self.wfile.write(f"data: {json.dumps(latest_payload)}\n\n".encode())
+                self.wfile.write(b"data: " + latest_payload_bytes + b"\n\n")
                 self.wfile.flush()
-                try:
-                    while True:
-                        self.wfile.write(b": ping\n\n")
-                        self.wfile.flush()
-                        time.sleep(15)
-                except (BrokenPipeError, ConnectionResetError):
-                    return
+                # Hand the connection over to the broadcaster thread; the
+                # spectrum updates themselves keep the connection alive, so no
+                # periodic ping is needed.
+                closed = threading.Event()
+                with sse_lock:
+                    sse_clients[self.wfile] = closed
+                closed.wait()
+                return
             self.send_response(404)
             self.end_headers()
         except Exception as e:
@@ -599,7 +828,7 @@ class H(BaseHTTPRequestHandler):
             
             if self.path == "/api/triggers":
                 try:
-                    data = json.loads(body)
+                    data = _loads(body)
                     print(f"[wp-audio] Received trigger save request: {len(body)} bytes", flush=True)
                     # Save just triggers
                     trigger_file = "/data/trigger_config.json"
@@ -625,7 +854,7 @@ class H(BaseHTTPRequestHandler):
             
             if self.path == "/api/config":
                 try:
-                    data = json.loads(body)
+                    data = _loads(body)
                     print(f"[wp-audio] Received config save request: {len(body)} bytes", flush=True)
                     # Save entire configuration
                     config_file = "/data/analyzer_config.json"
@@ -634,6 +863,14 @@ class H(BaseHTTPRequestHandler):
                         json.dump(data, f, indent=2)
                     print(f"[wp-audio] Configuration saved to {config_file}: {len(data.get('triggers', []))} triggers, logic={data.get('logic')}", flush=True)
                     
+                    # Apply the keys the loop can pick up without a restart,
+                    # then bump the version so it refreshes its locals. Band
+                    # layout / buffer sizes still need the restart below.
+                    for key in ("triggers", "logic", "storageLocation", "recLength", "prominentTrigger", "dbWeighting"):
+                        if key in data:
+                            analyzer_config[key] = data[key]
+                    config_version["n"] += 1
+                    
                     # Trigger add-on restart to apply configuration changes via Supervisor API
                     import threading
                     import urllib.request
@@ -685,8 +922,14 @@ class H(BaseHTTPRequestHandler):
 
 def start_http(port):
     try:
-        srv = HTTPServer(("0.0.0.0", port), H)
+        # Threading server: a parked SSE connection no longer blocks config
+        # POSTs or the events API.
+        srv = ThreadingHTTPServer(("0.0.0.0", port), H)
+        # Handler threads must not keep the process alive on shutdown - a
+        # parked SSE connection would otherwise block exit indefinitely.
+        srv.daemon_threads = True
         threading.Thread(target=srv.serve_forever, daemon=True).start()
+        threading.Thread(target=sse_broadcaster, daemon=True).start()
         print(f"[wp-audio] Web-UI läuft auf Ingress (Port {port})", flush=True)
     except Exception as e:
         print(f"[wp-audio] FEHLER beim Starten des HTTP-Servers: {e}", flush=True)
@@ -716,8 +959,8 @@ def main():
     config_file = "/data/analyzer_config.json"
     if os.path.exists(config_file):
         try:
-            with open(config_file, "r") as f:
-                saved_config = json.load(f)
+            with open(config_file, "rb") as f:
+                saved_config = _loads(f.read())
                 analyzer_config.update(saved_config)
                 # Parse selected_sensors as comma-separated string if needed
                 sel = analyzer_config.get("selected_sensors", [])
@@ -764,71 +1007,88 @@ def main():
     # MQTT
     connected = {"ok": False}
     record_spectrum = {"enabled": False}  # Control spectrum recording (default OFF)
-    
+
+    # Home Assistant discovery payloads are static per run - build and encode
+    # them once instead of rebuilding the dicts on every (re)connect.
+    dev, dev_id = device_info(); disc = "homeassistant"
+    cfgspec={"name":"AT Spectrum","unique_id":f"{dev_id}_at_spectrum","state_topic":f"{args.topic_base}/spectrum",
+             "value_template":"{{ value_json.ts }}","json_attributes_topic":f"{args.topic_base}/spectrum",
+             "availability_topic":f"{args.topic_base}/availability","device":dev,"icon":"mdi:waveform"}
+    cfgspec_live={"name":"AT Spectrum Live","unique_id":f"{dev_id}_at_spectrum_live","state_topic":f"{args.topic_base}/spectrum_live",
+             "value_template":"{{ value_json.ts }}","json_attributes_topic":f"{args.topic_base}/spectrum_live",
+             "availability_topic":f"{args.topic_base}/availability","device":dev,"icon":"mdi:waveform"}
+    # Event log sensor
+    cfgevent={"name":"AT Event Log","unique_id":f"{dev_id}_at_event_log","state_topic":f"{args.topic_base}/event",
+             "value_template":"{{ value_json.start }}","json_attributes_topic":f"{args.topic_base}/event",
+             "availability_topic":f"{args.topic_base}/availability","device":dev,"icon":"mdi:calendar-clock"}
+    # Switch to control spectrum recording
+    cfgswitch={"name":"AT Record Spectrum","unique_id":f"{dev_id}_at_record_spectrum",
+              "state_topic":f"{args.topic_base}/record_spectrum/state",
+              "command_topic":f"{args.topic_base}/record_spectrum/set",
+              "payload_on":"ON","payload_off":"OFF",
+              "state_on":"ON","state_off":"OFF",
+              "optimistic":False,"qos":1,
+              "availability_topic":f"{args.topic_base}/availability",
+              "device":dev,"icon":"mdi:database"}
+    discovery_configs = [
+        (f"{disc}/sensor/{dev_id}/at_spectrum/config", json.dumps(cfgspec).encode()),
+        (f"{disc}/sensor/{dev_id}/at_spectrum_live/config", json.dumps(cfgspec_live).encode()),
+        (f"{disc}/sensor/{dev_id}/at_event_log/config", json.dumps(cfgevent).encode()),
+        (f"{disc}/switch/{dev_id}/at_record_spectrum/config", json.dumps(cfgswitch).encode()),
+    ]
+    # Old discovery configs removed on every connect (cleanup from previous versions)
+    stale_discovery_topics = [
+        f"{disc}/sensor/{dev_id}/spectrum/config",
+        f"{disc}/sensor/{dev_id}/spectrum_live/config",
+        f"{disc}/sensor/{dev_id}/octA_80/config",
+        f"{disc}/sensor/{dev_id}/octA_160/config",
+        f"{disc}/sensor/{dev_id}/wp_spectrum/config",
+        f"{disc}/sensor/{dev_id}/wp_spectrum_live/config",
+        f"{disc}/sensor/{dev_id}/event_log/config",
+        f"{disc}/switch/{dev_id}/record_spectrum/config",
+        # Also clean up old wp_audio_trigger device configs
+        f"{disc}/sensor/wp_audio_trigger/wp_spectrum/config",
+        f"{disc}/sensor/wp_audio_trigger/wp_spectrum_live/config",
+        f"{disc}/sensor/wp_audio_trigger/event_log/config",
+        f"{disc}/switch/wp_audio_trigger/record_spectrum/config",
+    ]
+
+    # Topic strings are immutable once topic_base is parsed; build each of
+    # them exactly once instead of re-interpolating per publish / message.
+    topic_availability = f"{args.topic_base}/availability"
+    topic_selftest = f"{args.topic_base}/selftest"
+    topic_event = f"{args.topic_base}/event"
+    topic_spectrum = f"{args.topic_base}/spectrum"
+    topic_spectrum_live = f"{args.topic_base}/spectrum_live"
+    topic_record_state = f"{args.topic_base}/record_spectrum/state"
+    topic_record_set = f"{args.topic_base}/record_spectrum/set"
+
     def on_connect(client, userdata, flags, rc, properties=None):
         if rc == 0:
             connected["ok"] = True
             print("[wp-audio] MQTT verbunden")
-            client.publish(f"{args.topic_base}/availability", "online", qos=1, retain=True)
-            client.publish(f"{args.topic_base}/selftest", "ok", qos=1, retain=True)
+            client.publish(topic_availability, "online", qos=1, retain=True)
+            client.publish(topic_selftest, "ok", qos=1, retain=True)
             
             # Subscribe to control topics
-            client.subscribe(f"{args.topic_base}/record_spectrum/set")
-            print(f"[wp-audio] Subscribed to {args.topic_base}/record_spectrum/set", flush=True)
+            client.subscribe(topic_record_set)
+            print(f"[wp-audio] Subscribed to {topic_record_set}", flush=True)
             
-            dev, dev_id = device_info(); disc = "homeassistant"
-            cfgspec={"name":"AT Spectrum","unique_id":f"{dev_id}_at_spectrum","state_topic":f"{args.topic_base}/spectrum",
-                     "value_template":"{{ value_json.ts }}","json_attributes_topic":f"{args.topic_base}/spectrum",
-                     "availability_topic":f"{args.topic_base}/availability","device":dev,"icon":"mdi:waveform"}
-            cfgspec_live={"name":"AT Spectrum Live","unique_id":f"{dev_id}_at_spectrum_live","state_topic":f"{args.topic_base}/spectrum_live",
-                     "value_template":"{{ value_json.ts }}","json_attributes_topic":f"{args.topic_base}/spectrum_live",
-                     "availability_topic":f"{args.topic_base}/availability","device":dev,"icon":"mdi:waveform"}
-            
-            # Event log sensor
-            cfgevent={"name":"AT Event Log","unique_id":f"{dev_id}_at_event_log","state_topic":f"{args.topic_base}/event",
-                     "value_template":"{{ value_json.start }}","json_attributes_topic":f"{args.topic_base}/event",
-                     "availability_topic":f"{args.topic_base}/availability","device":dev,"icon":"mdi:calendar-clock"}
-            
-            # Create a switch to control spectrum recording
-            cfgswitch={"name":"AT Record Spectrum","unique_id":f"{dev_id}_at_record_spectrum",
-                      "state_topic":f"{args.topic_base}/record_spectrum/state",
-                      "command_topic":f"{args.topic_base}/record_spectrum/set",
-                      "payload_on":"ON","payload_off":"OFF",
-                      "state_on":"ON","state_off":"OFF",
-                      "optimistic":False,"qos":1,
-                      "availability_topic":f"{args.topic_base}/availability",
-                      "device":dev,"icon":"mdi:database"}
-            
-            # Delete old discovery configs (cleanup from previous versions)
-            client.publish(f"{disc}/sensor/{dev_id}/spectrum/config", "", qos=1, retain=True)
-            client.publish(f"{disc}/sensor/{dev_id}/spectrum_live/config", "", qos=1, retain=True)
-            client.publish(f"{disc}/sensor/{dev_id}/octA_80/config", "", qos=1, retain=True)
-            client.publish(f"{disc}/sensor/{dev_id}/octA_160/config", "", qos=1, retain=True)
-            client.publish(f"{disc}/sensor/{dev_id}/wp_spectrum/config", "", qos=1, retain=True)
-            client.publish(f"{disc}/sensor/{dev_id}/wp_spectrum_live/config", "", qos=1, retain=True)
-            client.publish(f"{disc}/sensor/{dev_id}/event_log/config", "", qos=1, retain=True)
-            client.publish(f"{disc}/switch/{dev_id}/record_spectrum/config", "", qos=1, retain=True)
-            # Also clean up old wp_audio_trigger device configs
-            client.publish(f"{disc}/sensor/wp_audio_trigger/wp_spectrum/config", "", qos=1, retain=True)
-            client.publish(f"{disc}/sensor/wp_audio_trigger/wp_spectrum_live/config", "", qos=1, retain=True)
-            client.publish(f"{disc}/sensor/wp_audio_trigger/event_log/config", "", qos=1, retain=True)
-            client.publish(f"{disc}/switch/wp_audio_trigger/record_spectrum/config", "", qos=1, retain=True)
-            
-            # Publish current discovery configs
-            client.publish(f"{disc}/sensor/{dev_id}/at_spectrum/config", json.dumps(cfgspec), qos=1, retain=True)
-            client.publish(f"{disc}/sensor/{dev_id}/at_spectrum_live/config", json.dumps(cfgspec_live), qos=1, retain=True)
-            client.publish(f"{disc}/sensor/{dev_id}/at_event_log/config", json.dumps(cfgevent), qos=1, retain=True)
-            client.publish(f"{disc}/switch/{dev_id}/at_record_spectrum/config", json.dumps(cfgswitch), qos=1, retain=True)
+            # Delete old discovery configs, then publish the current ones
+            for topic in stale_discovery_topics:
+                client.publish(topic, "", qos=1, retain=True)
+            for topic, payload in discovery_configs:
+                client.publish(topic, payload, qos=1, retain=True)
             
             # Publish initial state
-            client.publish(f"{args.topic_base}/record_spectrum/state", "ON" if record_spectrum["enabled"] else "OFF", qos=1, retain=True)
+            client.publish(topic_record_state, "ON" if record_spectrum["enabled"] else "OFF", qos=1, retain=True)
         else:
             print(f"[wp-audio] MQTT connect failed rc={rc}")
 
     def on_message(client, userdata, msg):
         try:
             payload = msg.payload.decode('utf-8')
-            if msg.topic == f"{args.topic_base}/record_spectrum/set":
+            if msg.topic == topic_record_set:
                 if payload == "ON":
                     record_spectrum["enabled"] = True
                     print("[wp-audio] Spectrum recording ENABLED", flush=True)
@@ -836,7 +1096,7 @@ def main():
                     record_spectrum["enabled"] = False
                     print("[wp-audio] Spectrum recording DISABLED", flush=True)
                 # Echo state back
-                client.publish(f"{args.topic_base}/record_spectrum/state", payload, qos=1, retain=True)
+                client.publish(topic_record_state, payload, qos=1, retain=True)
         except Exception as e:
             print(f"[wp-audio] MQTT message error: {e}", flush=True)
     
@@ -844,9 +1104,24 @@ def main():
         connected["ok"] = False
         print(f"[wp-audio] MQTT disconnected rc={rc}")
 
+    # MQTT publishes from the audio loop go through a small queue consumed by
+    # a dedicated thread, so a stalled broker connection can never block
+    # stream.read(). The queue drops payloads instead of backing up.
+    publish_q = queue.Queue(maxsize=4)
+    def mqtt_publisher():
+        while True:
+            topics, payload, qos = publish_q.get()
+            try:
+                data = _dumps(payload)
+                for topic in topics:
+                    client.publish(topic, data, qos=qos)
+            except Exception as e:
+                print(f"[wp-audio] MQTT publish error: {e}", flush=True)
+    threading.Thread(target=mqtt_publisher, daemon=True).start()
+
     client = mqtt.Client(callback_api_version=mqtt.CallbackAPIVersion.VERSION1, protocol=mqtt.MQTTv311)
     client.on_connect = on_connect; client.on_disconnect = on_disconnect; client.on_message = on_message
-    client.will_set(f"{args.topic_base}/availability", payload="offline", qos=1, retain=True)
+    client.will_set(topic_availability, payload="offline", qos=1, retain=True)
     if args.mqtt_user: client.username_pw_set(args.mqtt_user, args.mqtt_pass)
     client.connect_async(args.mqtt_host, args.mqtt_port, 60); client.loop_start()
     t0=time.time()
@@ -878,56 +1153,128 @@ def main():
             except Exception as e:
                 print(f"[wp-audio] WARNING: invalid calibration entry {freq_key}={offset_str}: ignored ({e})", flush=True)
     
-    def spl_db(rms): return 20.0*np.log10(max(rms,1e-20)/20e-6)+cal_off
 
     # Ziel-SR & Filter-Builder
     fs_target = int(args.samplerate)
     # Blockzeit = Publish-Intervall für synchrone Spektrum-Erfassung
     block_sec = float(args.spectrum_interval)
+    # FCS_LOW and FCS_FULL are identical since bands became configurable, so a
+    # single filter bank serves both the trigger path and the spectrum path.
+    # Coefficients and per-band filter state live in two contiguous arrays
+    # (SoA layout, indexed by band position) instead of dicts keyed by fc;
+    # the state persists across blocks so the filters run as streaming IIRs
+    # without per-block transients.
+    # Filters are designed in float64 (butter needs the precision) and then
+    # cast: with float32 coefficients, state and input, sosfilt/lfilter run
+    # entirely in single precision, halving memory traffic through the bank.
+    # Second-order sections stay well-conditioned in float32.
     def build_filters(fs):
-        sos_low  = {fc: band_sos(fc, fs) for fc in FCS_LOW}
-        sos_full = {fc: band_sos(fc, fs) for fc in FCS_FULL}
-        return sos_low, sos_full
-    sos_low, sos_full = build_filters(fs_target)
-    a_low    = {fc: a_corr(fc) for fc in FCS_LOW}
+        stack = np.stack([band_sos(fc, fs) for fc in FCS_LOW]).astype(np.float32)
+        zi = np.zeros((stack.shape[0], stack.shape[1], 2), np.float32)
+        return stack, zi
+    # --- Analysis-rate decimation ---
+    # The heat-pump use case caps maxFreq at a few hundred Hz; at 48 kHz those
+    # bands are heavily oversampled. When the top band edge leaves enough
+    # headroom, low-pass the block once and keep every dec_factor-th sample,
+    # so each band filter traverses dec_factor times fewer samples. Only the
+    # analysis path is decimated - recordings keep the full-rate signal.
+    def pick_decimation(fs):
+        dec = 1
+        top_edge = max(FCS_LOW) * K
+        while dec < 8 and fs // (dec * 2) >= top_edge * 5:
+            dec *= 2
+        return dec
+
+    def build_antialias(dec):
+        if dec == 1:
+            return None, None
+        fir = firwin(30 * dec + 1, 0.8 / dec).astype(np.float32)
+        return fir, np.zeros(len(fir) - 1, np.float32)
+
+    dec_factor = pick_decimation(fs_target)
+    aa_fir, aa_zi = build_antialias(dec_factor)
+    if dec_factor > 1:
+        print(f"[wp-audio] Analysis decimated by {dec_factor} (bands end at {max(FCS_LOW)} Hz)", flush=True)
+
+    sos_stack, sos_zi = build_filters(fs_target // dec_factor)
+    # The band filters are independent and scipy's sosfilt releases the GIL,
+    # so on multi-core hosts the bank can run in a small worker pool. Below
+    # the sample threshold the dispatch overhead outweighs the win.
+    PARALLEL_MIN_SAMPLES = 20000
+    n_workers = min(4, os.cpu_count() or 1)
+    band_pool = ThreadPoolExecutor(max_workers=n_workers) if n_workers > 1 else None
+    a_low    = a_corr_arr(FCS_LOW).astype(np.float32)
+    # Precompute the spectrum weighting per band once; the hot loop then only
+    # adds a vector element instead of branching and calling a_corr/c_corr.
+    if args.spectrum_weighting == "A":
+        w_spec = a_low
+    elif args.spectrum_weighting == "C":
+        w_spec = c_corr_arr(FCS_LOW).astype(np.float32)
+    else:
+        w_spec = np.zeros(len(FCS_LOW), np.float32)
 
     # Build interpolated calibration corrections for current target bands
     def build_interpolated_corr(bcorr: dict, targets: list) -> dict:
         if not bcorr:
             return {fc: 0.0 for fc in targets}
-        # Sort calibration points by frequency
+        # Piecewise-linear interpolation on log10(f) via np.interp (which
+        # also clamps to the edge values), exact calibration points win.
         cps = sorted(((float(f), float(v)) for f, v in bcorr.items()), key=lambda x: x[0])
-        freqs = [f for f, _ in cps]
-        logs  = [math.log10(f) for f in freqs]
-        vals  = [v for _, v in cps]
-        def interp(fc: float) -> float:
-            lf = math.log10(fc)
-            if lf <= logs[0]:
-                return vals[0]
-            if lf >= logs[-1]:
-                return vals[-1]
-            # Find interval
-            for i in range(1, len(logs)):
-                if lf <= logs[i]:
-                    w = (lf - logs[i-1]) / (logs[i] - logs[i-1])
-                    return vals[i-1] * (1.0 - w) + vals[i] * w
-            return 0.0
-        result = {}
-        for fc in targets:
-            result[fc] = bcorr.get(fc, interp(fc))
-        return result
+        logs = np.log10([f for f, _ in cps])
+        vals = np.array([v for _, v in cps])
+        interp_vals = np.interp(np.log10(targets), logs, vals)
+        return {fc: bcorr.get(fc, float(v)) for fc, v in zip(targets, interp_vals)}
 
     corr_low  = build_interpolated_corr(band_corr, FCS_LOW)
-    corr_full = build_interpolated_corr(band_corr, FCS_FULL)
+    corr_vec  = np.array([corr_low.get(fc, 0.0) for fc in FCS_LOW], np.float32)
+    # Every additive term per path - calibration offset, band correction and
+    # frequency weighting - is folded into one lookup vector, so the hot loop
+    # does a single vector add per output path on top of the raw log levels.
+    db_off    = np.float32(cal_off) + corr_vec  # Z-weighted path
+    dba_off   = db_off + a_low                  # A-weighted path
+    spec_off  = db_off + w_spec                 # spectrum path
+    # Linear-domain factor equivalent to spec_off; lets the spectrum energy
+    # be computed straight from the RMS vector without a dB round-trip.
+    spec_pow  = (10.0 ** (spec_off.astype(np.float64) / 10)).astype(np.float32)
 
-    pre_buf=deque(maxlen=max(1,int(args.pre/block_sec)))
+    pre_len = max(1,int(args.pre/block_sec))  # slots in the pre-trigger audio ring (allocated once block size is known)
     spec_buf=deque(maxlen=max(1,int(args.pre/block_sec)))  # Ring buffer for spectrum data
     post_buf_audio=deque(maxlen=max(1,int(args.post/block_sec)))
     post_buf_spec=deque(maxlen=max(1,int(args.post/block_sec)))
-    S = {"trig": False, "hold": 0, "post_left": 0, "peak80": -999.0, "peak160": -999.0,
-        "cur_dir": None, "event_audio": [], "event_specs": [], "overall_dbA": [],
-        "event_start_time": None, "actual_duration": 0, "recording_stopped": False,
-        "hold_start_idx": None, "hold_start_time": None}
+    # Band-position lookup shared by the peak stats below and the trigger
+    # arrays further down.
+    fcs_index = {fc: i for i, fc in enumerate(FCS_LOW)}
+    # Per-band peak hold for the current event; the 80/160 Hz legacy stats
+    # are read out of this vector at event end.
+    peaks = np.full(len(FCS_LOW), -999.0, np.float32)
+    idx80 = fcs_index.get(80); idx160 = fcs_index.get(160)
+
+    class EventState:
+        """Mutable per-event recording state. __slots__ makes every field a
+        fixed-offset attribute, so the block path does no dict hashing."""
+        __slots__ = ("trig", "hold", "post_left", "cur_dir", "event_audio",
+                     "ea_w", "event_specs", "overall_dbA", "odba_w",
+                     "actual_duration", "recording_stopped", "hold_start_idx")
+
+        def __init__(self):
+            self.hold = 0
+            self.post_left = 0
+            self.hold_start_idx = None
+            self.reset()
+
+        def reset(self):
+            """Back to idle; called at startup and after each event handoff."""
+            self.trig = False
+            self.cur_dir = None
+            self.event_audio = np.zeros(0, np.float32)
+            self.ea_w = 0
+            self.event_specs = []
+            self.overall_dbA = np.zeros(0, np.float32)
+            self.odba_w = 0
+            self.actual_duration = 0
+            self.recording_stopped = False
+
+    S = EventState()
     if not args.event_dir:
         raise ValueError("event_dir is empty! Please set a valid storage location.")
     os.makedirs(args.event_dir, exist_ok=True)
@@ -936,17 +1283,118 @@ def main():
     trigger_log = []
     trigger_states = {}  # Track active triggers: {freq: {"start_time": ts, "start_amp": amp}}
 
+    # Trigger config is parsed when it changes, not on every block: band
+    # triggers become an index vector into la_arr plus a threshold vector, so
+    # the per-block evaluation is a single vectorized comparison. The cache is
+    # invalidated by identity - saving the config replaces the triggers list.
+    trig_cache = {"src": None, "logic": None}
+
+    def rebuild_trigger_arrays(triggers, logic):
+        band_keys = []; band_idx = []; band_thr = []
+        sum_thr = None
+        for trig in triggers:
+            freq = trig.get("freq")
+            amp = trig.get("amp", 0)
+            if not freq or amp <= 0:
+                continue
+            if freq == "sum":
+                sum_thr = float(amp)
+                continue
+            try:
+                freq_val = float(freq)
+            except Exception:
+                continue
+            idx = fcs_index.get(freq_val)
+            if idx is None:
+                print(f"[wp-audio] WARNING: Trigger frequency {freq_val} Hz not found in current bands. Available: {sorted(fcs_index)}", flush=True)
+                continue
+            band_keys.append(freq_val); band_idx.append(idx); band_thr.append(float(amp))
+        # Required hold duration depends only on config, so it is derived here
+        # too: AND waits for the longest trigger, OR for the shortest non-zero.
+        durations = [
+            trig.get("duration", 0)
+            for trig in triggers
+            if trig.get("amp", 0) > 0 and (
+                (trig.get("freq") == "sum") or
+                (trig.get("freq") and str(trig.get("freq")).replace('.', '', 1).isdigit())
+            )
+        ]
+        required_duration = args.hold_sec
+        if durations:
+            if logic == "AND":
+                required_duration = max(durations)
+            else:  # OR
+                positive = [d for d in durations if d > 0]
+                required_duration = min(positive) if positive else args.hold_sec
+        trig_cache.update({
+            "src": triggers, "logic": logic,
+            "band_keys": band_keys,
+            "band_idx": np.array(band_idx, np.intp),
+            "band_thr": np.array(band_thr, np.float32),
+            "sum_thr": sum_thr,
+            "active_count": sum(1 for t in triggers if (t.get("freq") and t.get("amp", 0) > 0)),
+            "required_duration": required_duration,
+        })
+
+    def trig_held_seconds(start_iso, end_iso):
+        try:
+            start_dt = dt.datetime.fromisoformat(start_iso.replace('Z', '+00:00'))
+            end_dt = dt.datetime.fromisoformat(end_iso.replace('Z', '+00:00'))
+            return (end_dt - start_dt).total_seconds()
+        except Exception:
+            return 0.0
+
+    def ea_alloc(blocks):
+        """Preallocate the event audio buffer and copy the pre-buffer blocks in."""
+        cap = int((args.pre + args.post + 5) * current_fs)
+        n = sum(len(b) for b in blocks)
+        buf = np.empty(max(cap, n), np.float32)
+        w = 0
+        for b in blocks:
+            buf[w:w+len(b)] = b; w += len(b)
+        return buf, w
+
+    def odba_append(v):
+        """Append one overall-dB(A) sample; same grow-on-demand float32
+        scheme as the event audio buffer, no per-block list append."""
+        buf = S.overall_dbA; w = S.odba_w
+        if w >= buf.shape[0]:
+            grown = np.empty(buf.shape[0] * 2 + 64, np.float32)
+            grown[:w] = buf
+            S.overall_dbA = buf = grown
+        buf[w] = v
+        S.odba_w = w + 1
+
+    def ea_append(samples):
+        """Slice-assign a block into the event buffer; grows geometrically if
+        the trigger stays active longer than the initial pre+post sizing."""
+        buf = S.event_audio; w = S.ea_w; n = len(samples)
+        if w + n > buf.shape[0]:
+            grown = np.empty(buf.shape[0] * 2 + n, np.float32)
+            grown[:w] = buf[:w]
+            S.event_audio = buf = grown
+        buf[w:w+n] = samples
+        S.ea_w = w + n
+
     def start_event():
-        S["trig"]=True; S["post_left"]=args.post
-        S["cur_dir"]=os.path.join(args.event_dir, now_utc()); os.makedirs(S["cur_dir"], exist_ok=True)
-        S["event_audio"]=list(pre_buf); S["event_specs"]=[]; S["peak80"]=-999.0; S["peak160"]=-999.0
-        print(f"[wp-audio] Event START {S['cur_dir']}")
+        S.trig=True; S.post_left=args.post
+        S.cur_dir=os.path.join(args.event_dir, now_utc()); os.makedirs(S.cur_dir, exist_ok=True)
+        S.event_audio, S.ea_w = ea_alloc(pre_snapshot()); S.event_specs=[]; peaks.fill(-999.0)
+        print(f"[wp-audio] Event START {S.cur_dir}")
 
-    def end_event(current_fs):
-        if not S["cur_dir"]: return
-        audio=np.concatenate(S["event_audio"],axis=0) if S["event_audio"] else np.zeros(0,np.float32)
-        wav=os.path.join(S["cur_dir"],"audio.flac"); sf.write(wav, audio, int(current_fs), format="FLAC")
-        csv = os.path.join(S["cur_dir"], "spectrum.csv")
+    def write_event_files(cur_dir, audio, current_fs, event_specs, trig_log,
+                          overall_dbA, peak80, peak160, actual_duration, stop_time):
+        """Finalize an event on disk: FLAC, CSVs, metadata JSON, MQTT notify.
+
+        Runs on the event-writer thread; every argument is owned by the job
+        (the audio loop rebinds its own state before queueing the next one).
+        """
+        # Quantize to int16 before encoding: the mic chain's dynamic range
+        # fits comfortably in 16 bit and the FLAC encoder then consumes half
+        # the bandwidth compared to float32 input.
+        audio_i16=np.clip(audio*32767.0, -32768, 32767).astype(np.int16)
+        wav=os.path.join(cur_dir,"audio.flac"); sf.write(wav, audio_i16, current_fs, format="FLAC", subtype="PCM_16")
+        csv = os.path.join(cur_dir, "spectrum.csv")
         # Determine which weighting to record based on config
         weighting = analyzer_config.get("dbWeighting", "A")
         if weighting == "A":
@@ -957,33 +1405,38 @@ def main():
             col_prefix = "LD"
         else:
             col_prefix = "LA"  # fallback
-        with open(csv, "w") as f:
-            f.write("ts," + ",".join([f"{col_prefix}_{fc}" for fc in FCS_LOW]) + f",{col_prefix}_sum\n")
-            for r in S["event_specs"]:
-                # Get the correct band values
-                band_vals = r.get(col_prefix, {})
-                vals = [band_vals.get(fc, 0.0) for fc in FCS_LOW]
-                # Calculate sum value (energy sum, then dB)
-                energies = [10 ** (v / 10) for v in vals]
-                sum_val = 10 * math.log10(sum(energies)) if energies and sum(energies) > 0 else 0.0
-                f.write(r["ts"] + "," + ",".join(f"{v:.2f}" for v in vals) + f",{sum_val:.2f}\n")
+        # Assemble each CSV in memory and write it with one buffered call;
+        # per-row write() on a small default buffer hits the filesystem far
+        # too often for multi-minute events.
+        rows = ["ts," + ",".join([f"{col_prefix}_{fc}" for fc in FCS_LOW]) + f",{col_prefix}_sum"]
+        for r in event_specs:
+            band_vals = r.get(col_prefix, {})
+            vals = [band_vals.get(fc, 0.0) for fc in FCS_LOW]
+            # Calculate sum value (energy sum, then dB)
+            energies = [10 ** (v / 10) for v in vals]
+            sum_val = 10 * math.log10(sum(energies)) if energies and sum(energies) > 0 else 0.0
+            rows.append(r["ts"] + "," + ",".join(f"{v:.2f}" for v in vals) + f",{sum_val:.2f}")
+        rows.append("")
+        with open(csv, "w", buffering=65536) as f:
+            f.write("\n".join(rows))
         
         # Save trigger log
-        trigger_csv=os.path.join(S["cur_dir"],"trigger_log.csv")
-        with open(trigger_csv,"w") as f:
-            f.write("time,frequency,amplitude,duration\n")
-            for entry in trigger_log:
-                f.write(f"{entry['time']},{entry['frequency']},{entry['amplitude']},{entry['duration']}\n")
+        trigger_csv=os.path.join(cur_dir,"trigger_log.csv")
+        rows = ["time,frequency,amplitude,duration"]
+        rows.extend(f"{entry['time']},{entry['frequency']},{entry['amplitude']},{entry['duration']}" for entry in trig_log)
+        rows.append("")
+        with open(trigger_csv, "w", buffering=65536) as f:
+            f.write("\n".join(rows))
         
         # Calculate overall dB(A) statistics
-        max_overall_dbA = max(S["overall_dbA"]) if S["overall_dbA"] else 0.0
-        avg_overall_dbA = sum(S["overall_dbA"]) / len(S["overall_dbA"]) if S["overall_dbA"] else 0.0
+        max_overall_dbA = float(overall_dbA.max()) if overall_dbA.size else 0.0
+        avg_overall_dbA = float(overall_dbA.mean()) if overall_dbA.size else 0.0
         
         # Save comprehensive event metadata as JSON
         metadata = {
-            "event_id": os.path.basename(S["cur_dir"]),
-            "start_time": os.path.basename(S["cur_dir"]),
-            "stop_time": now_utc(),
+            "event_id": os.path.basename(cur_dir),
+            "start_time": os.path.basename(cur_dir),
+            "stop_time": stop_time,
             "configuration": {
                 "bands": analyzer_config.get("bands", "3octave"),
                 "minFreq": analyzer_config.get("minFreq", 31.5),
@@ -997,11 +1450,11 @@ def main():
             "statistics": {
                 "max_overall_dbA": round(max_overall_dbA, 2),
                 "avg_overall_dbA": round(avg_overall_dbA, 2),
-                "peak_A80": round(S["peak80"], 2),
-                "peak_A160": round(S["peak160"], 2),
-                "trigger_count": len(trigger_log),
-                "actual_duration_seconds": round(S["actual_duration"], 2),
-                "recorded_duration_seconds": len(S["event_specs"]) * block_sec if S["event_specs"] else 0
+                "peak_A80": round(peak80, 2),
+                "peak_A160": round(peak160, 2),
+                "trigger_count": len(trig_log),
+                "actual_duration_seconds": round(actual_duration, 2),
+                "recorded_duration_seconds": len(event_specs) * block_sec if event_specs else 0
             },
             "files": {
                 "audio": "audio.flac",
@@ -1009,12 +1462,20 @@ def main():
                 "trigger_log": "trigger_log.csv",
                 "metadata": "event_metadata.json"
             },
-            "triggers": trigger_log
+            "triggers": trig_log
         }
         
-        metadata_file = os.path.join(S["cur_dir"], "event_metadata.json")
+        metadata_file = os.path.join(cur_dir, "event_metadata.json")
         with open(metadata_file, "w") as f:
             json.dump(metadata, f, indent=2)
+        # The /api/events cache is keyed on the storage dir's mtime, which
+        # only moves when an entry is added or removed - not when this
+        # metadata file lands inside the already-created event dir. Touch the
+        # parent so the next poll picks the finished event up.
+        try:
+            os.utime(os.path.dirname(cur_dir))
+        except OSError:
+            pass
         
         # Simplified MQTT payload with key metadata
         payload = {
@@ -1026,15 +1487,45 @@ def main():
             "trigger_count": metadata["statistics"]["trigger_count"],
             "actual_duration": metadata["statistics"]["actual_duration_seconds"],
             "recorded_duration": metadata["statistics"]["recorded_duration_seconds"],
-            "event_dir": S["cur_dir"]
+            "event_dir": cur_dir
         }
-        try: client.publish(f"{args.topic_base}/event", json.dumps(payload), qos=1)
-        except: pass
-        print(f"[wp-audio] Event ENDE {S['cur_dir']} (Duration={S['actual_duration']:.1f}s, Recorded={len(S['event_specs']) * block_sec:.1f}s, Max dB(A)={max_overall_dbA:.1f}, Avg dB(A)={avg_overall_dbA:.1f}, Triggers={len(trigger_log)})")
-        
-        # Clear trigger log for next event
-        trigger_log.clear()
-        S.update({"trig":False,"cur_dir":None,"event_audio":[],"event_specs":[],"overall_dbA":[],"event_start_time":None,"actual_duration":0,"recording_stopped":False})
+        if connected["ok"]:
+            try: publish_q.put_nowait(([topic_event], payload, 1))
+            except queue.Full: pass
+        print(f"[wp-audio] Event ENDE {cur_dir} (Duration={actual_duration:.1f}s, Recorded={len(event_specs) * block_sec:.1f}s, Max dB(A)={max_overall_dbA:.1f}, Avg dB(A)={avg_overall_dbA:.1f}, Triggers={len(trig_log)})")
+
+    # FLAC-encoding a multi-minute event takes seconds; done inline it would
+    # stall stream.read() long enough to overflow the capture buffer. A
+    # dedicated writer thread drains finalization jobs instead.
+    event_write_q = queue.Queue()
+    def event_writer():
+        while True:
+            job = event_write_q.get()
+            try:
+                write_event_files(**job)
+            except Exception as e:
+                print(f"[wp-audio] Event writer error: {e}", flush=True)
+    threading.Thread(target=event_writer, daemon=True).start()
+
+    def end_event(current_fs):
+        nonlocal trigger_log
+        if not S.cur_dir: return
+        # Hand the buffers to the writer by reference and rebind fresh state;
+        # nothing here copies audio or spectra on the audio thread.
+        event_write_q.put({
+            "cur_dir": S.cur_dir,
+            "audio": S.event_audio[:S.ea_w],
+            "current_fs": int(current_fs),
+            "event_specs": S.event_specs,
+            "trig_log": trigger_log,
+            "overall_dbA": S.overall_dbA[:S.odba_w],
+            "peak80": float(peaks[idx80]) if idx80 is not None else -999.0,
+            "peak160": float(peaks[idx160]) if idx160 is not None else -999.0,
+            "actual_duration": S.actual_duration,
+            "stop_time": now_utc(),
+        })
+        trigger_log = []
+        S.reset()
 
     print(f"[wp-audio] Input-Device: {args.device if args.device else '(Default/Pulse)'}  SR={fs_target}")
 
@@ -1046,7 +1537,7 @@ def main():
                               channels=1,
                               samplerate=(fs if fs>0 else None),
                               blocksize=(block if block>0 else None),
-                              dtype='float32')
+                              dtype='int16')
 
     open_plan = []
     if devname:
@@ -1078,8 +1569,15 @@ def main():
             current_fs = int(stream.samplerate)
             if current_fs != fs_target:
                 print(f"[wp-audio] Hinweis: tatsächliche fs={current_fs} Hz – Filter werden angepasst.")
-                sos_low, sos_full = build_filters(current_fs)
+                dec_factor = pick_decimation(current_fs)
+                aa_fir, aa_zi = build_antialias(dec_factor)
+                sos_stack, sos_zi = build_filters(current_fs // dec_factor)
             block_samples = int(current_fs * block_sec)
+            if dec_factor > 1 and block_samples % dec_factor:
+                # Keep the decimated stream phase-aligned across blocks
+                dec_factor = 1
+                aa_fir, aa_zi = build_antialias(1)
+                sos_stack, sos_zi = build_filters(current_fs)
             break
         except Exception as e:
             print(f"[wp-audio] Open fehlgeschlagen: {e}")
@@ -1089,78 +1587,119 @@ def main():
     if stream is None:
         raise RuntimeError("Konnte keinen Audio-Stream öffnen (alle Versuche fehlgeschlagen).")
 
+    # Pre-trigger audio ring: one preallocated float32 array written in place
+    # each block, instead of a deque holding a fresh copy per block.
+    pre_ring = np.empty((pre_len, block_samples), np.float32)
+    pre_idx = 0; pre_count = 0
+    def pre_snapshot():
+        """Return the buffered pre-trigger blocks in chronological order."""
+        if pre_count < pre_len:
+            return [pre_ring[i].copy() for i in range(pre_count)]
+        return [pre_ring[(pre_idx + i) % pre_len].copy() for i in range(pre_len)]
+
     # -------- Haupt-Loop --------
+    cfg_ver_seen = -1  # forces the config-derived locals to load on block one
     last_spec_pub = time.monotonic()  # monotonic time
-    spectrum_publish_buffer = []  # buffer for each publish interval (e.g. 125ms)
-    spectrum_rolling_buffer = []  # rolling buffer for averaging period
+    # Block-invariant values bound once; inside the loop each of these would
+    # cost an attribute lookup, a conversion or a scalar-boxing per block.
+    n_bands = len(FCS_LOW)
+    scale_i16 = np.float32(1.0 / 32768.0)
+    inv_pref32 = np.float32(INV_PREF)
+    aa_one = np.float32(1.0)
+    spec_interval = float(args.spectrum_interval)
+    band_labels = [str(int(fc)) if fc >= 100 else str(fc) for fc in FCS_FULL]
+    # Spectrum averaging state: every block carries the same band layout, so
+    # the publish-interval average is a running energy-sum vector and the
+    # rolling window a preallocated (roll_len, n_bands) float32 ring written
+    # in place - no lists of per-block dicts, no dict rebuilds per publish.
+    spec_accum = np.zeros(len(FCS_LOW), np.float32)
+    spec_accum_n = 0
+    roll_len = max(1, int(round(float(args.averaging_period) / float(args.spectrum_interval))))
+    spec_roll = np.zeros((roll_len, len(FCS_LOW)), np.float32)
+    spec_roll_idx = 0; spec_roll_n = 0
     try:
         while True:
             x, _ = stream.read(block_samples)
-            if x.ndim == 2:
-                x = x[:,0]
+            x = x[:, 0]  # stream is opened with channels=1, so shape is (N, 1)
+            # The stream delivers raw int16 PCM (the UMC202HD's native
+            # format), so PortAudio does no per-sample conversion; scale to
+            # float32 full-scale once per block here instead.
+            x = x.astype(np.float32)
+            x *= scale_i16
+            # Single pass over the filter bank: each band is filtered once and
+            # the result feeds both the trigger levels (LZ/LA) and the
+            # published spectrum energies. RMS->dB conversion happens once,
+            # vectorized over all bands.
+            if dec_factor > 1:
+                x_lp, aa_zi = lfilter(aa_fir, aa_one, x, zi=aa_zi)
+                x_an = x_lp[::dec_factor]
+            else:
+                x_an = x
+            rms = np.empty(n_bands, np.float32)
+            def run_band(b):
+                y, sos_zi[b] = sosfilt(sos_stack[b], x_an, zi=sos_zi[b])
+                # np.dot folds square+sum into one pass, no y*y temporary
+                rms[b] = np.sqrt(np.dot(y, y) / y.shape[0])
+            if band_pool is not None and n_bands * x_an.shape[0] >= PARALLEL_MIN_SAMPLES:
+                list(band_pool.map(run_band, range(n_bands)))
             else:
-                x = x.reshape(-1)
-            LZ={}; LA={}
-            for fc,sos in sos_low.items():
-                y=sosfilt(sos,x)
-                lz=spl_db(np.sqrt(np.mean(y*y)))+corr_low.get(fc,0.0)
-                la=lz+a_low[fc]
-                LZ[fc]=lz; LA[fc]=la
+                for b in range(n_bands):
+                    run_band(b)
+            log_base = 20.0*np.log10(np.maximum(rms, 1e-20)*INV_PREF)
+            lz_arr = log_base + db_off
+            la_arr = log_base + dba_off
+            LZ = dict(zip(FCS_LOW, lz_arr))
+            LA = dict(zip(FCS_LOW, la_arr))
+            # 10**((log_base+spec_off)/10) == (rms/p0)^2 * spec_pow - the RMS
+            # vector is already linear, so skip the pow/log round-trip.
+            p_rel = np.maximum(rms, 1e-20) * inv_pref32
+            spec_accum += p_rel * p_rel * spec_pow
+            spec_accum_n += 1
 
             # Legacy support for 80/160 Hz if they exist in bands
             la80 = LA.get(80, 0.0)
             la160 = LA.get(160, 0.0)
 
             # UI Snapshot (keep la80/la160 for internal use)
-            latest_payload.update({"la80": float(la80), "la160": float(la160)})
+            publish_snapshot({"la80": float(la80), "la160": float(la160)}, notify=False)
+
+            # One timestamp per block; every consumer below reuses it instead
+            # of re-running strftime.
+            ts_now = now_utc()
 
             # Pre-Buffer / Event-Aufnahme
-            pre_buf.append(x.copy())
-            rec={"ts":now_utc(),"LZ":LZ,"LA":LA}
+            pre_ring[pre_idx] = x
+            pre_idx = (pre_idx + 1) % pre_len
+            if pre_count < pre_len: pre_count += 1
+            rec={"ts":ts_now,"LZ":LZ,"LA":LA}
             spec_buf.append(rec)  # Always buffer spectrum data for events
-            # Always fill post buffers as well (they will be used only after trigger ends)
-            post_buf_audio.append(x.copy())
+            # Always fill post buffers as well (they will be used only after
+            # trigger ends). stream.read() hands us a freshly allocated array
+            # each call, so the blocks can be stored without copying.
+            post_buf_audio.append(x)
             post_buf_spec.append(rec)
 
-            # --- Calculate spectrum for this publish interval ---
-            spectrum_block = {}
-            for fc, sos in sos_full.items():
-                y = sosfilt(sos, x)
-                lz = spl_db(np.sqrt(np.mean(y*y))) + corr_full.get(fc, 0.0)
-                if args.spectrum_weighting == "A":
-                    v = lz + a_corr(fc)
-                elif args.spectrum_weighting == "C":
-                    v = lz + c_corr(fc)
-                else:
-                    v = lz
-                energy = 10 ** (v / 10)
-                spectrum_block[fc] = energy
-            spectrum_publish_buffer.append(spectrum_block)
-
             # Check if publish interval has elapsed
             now_mono = time.monotonic()
-            if (now_mono - last_spec_pub) >= float(args.spectrum_interval):
-                # Average over this publish interval
-                avg_energies = {}
-                for fc in FCS_FULL:
-                    fc_energies = [buf[fc] for buf in spectrum_publish_buffer if fc in buf]
-                    avg_energies[fc] = np.mean(fc_energies) if fc_energies else 0.0
-                # Add to rolling buffer
-                spectrum_rolling_buffer.append(avg_energies.copy())
-                # Limit rolling buffer to N = averaging_period / publish_interval
-                maxlen = int(round(float(args.averaging_period) / float(args.spectrum_interval)))
-                if len(spectrum_rolling_buffer) > maxlen:
-                    spectrum_rolling_buffer = spectrum_rolling_buffer[-maxlen:]
-                # Calculate rolling average for output
-                rolling_avg_energies = {}
-                for fc in FCS_FULL:
-                    fc_energies = [buf[fc] for buf in spectrum_rolling_buffer if fc in buf]
-                    rolling_avg_energies[fc] = np.mean(fc_energies) if fc_energies else 0.0
-                avg_vals = [round(10 * np.log10(rolling_avg_energies[fc]), 1) if rolling_avg_energies[fc] > 0 else 0.0 for fc in FCS_FULL]
-                sum_level = 10 * np.log10(sum(rolling_avg_energies.values())) if rolling_avg_energies and sum(rolling_avg_energies.values()) > 0 else 0.0
-                timestamp_avg = now_utc()
+            if (now_mono - last_spec_pub) >= spec_interval:
+                # Average over this publish interval, then push into the
+                # rolling window ring
+                if spec_accum_n:
+                    spec_roll[spec_roll_idx] = spec_accum / spec_accum_n
+                else:
+                    spec_roll[spec_roll_idx] = 0.0
+                spec_roll_idx = (spec_roll_idx + 1) % roll_len
+                if spec_roll_n < roll_len: spec_roll_n += 1
+                # Rolling average for output (order inside the ring is
+                # irrelevant for a mean)
+                rolling_avg = spec_roll[:spec_roll_n].mean(axis=0)
+                db_vals = 10 * np.log10(np.maximum(rolling_avg, 1e-30))
+                avg_vals = [round(float(v), 1) if e > 0 else 0.0 for v, e in zip(db_vals, rolling_avg)]
+                total_energy = float(rolling_avg.sum())
+                sum_level = 10 * math.log10(total_energy) if total_energy > 0 else 0.0
+                timestamp_avg = ts_now
                 payload_avg = {
-                    "bands": [str(int(fc)) if fc >= 100 else str(fc) for fc in FCS_FULL],
+                    "bands": band_labels,
                     "values": avg_vals,
                     "sum_level": round(sum_level, 1),
                     "weighting": args.spectrum_weighting,
@@ -1168,125 +1707,111 @@ def main():
                     "ts": timestamp_avg,
                     "time": timestamp_avg
                 }
-                latest_payload.update(payload_avg)
+                publish_snapshot(payload_avg)
                 # Publish rolling average as both live and averaged
-                try:
-                    client.publish(f"{args.topic_base}/spectrum_live", json.dumps(payload_avg), qos=0)
-                except:
-                    pass
-                if record_spectrum["enabled"]:
+                # Skip MQTT work entirely while the broker is unreachable
+                if connected["ok"]:
+                    spec_topics = [topic_spectrum_live]
+                    if record_spectrum["enabled"]:
+                        spec_topics.append(topic_spectrum)
                     try:
-                        client.publish(f"{args.topic_base}/spectrum", json.dumps(payload_avg), qos=0)
-                    except:
+                        publish_q.put_nowait((spec_topics, payload_avg, 0))
+                    except queue.Full:
                         pass
-                # Reset publish buffer and update last publish time
-                spectrum_publish_buffer = []
+                # Reset publish accumulator and update last publish time
+                spec_accum[:] = 0.0
+                spec_accum_n = 0
                 last_spec_pub = now_mono
 
-            # Dynamic Trigger Evaluation
-            triggers = analyzer_config.get("triggers", [])
-            logic = analyzer_config.get("logic", "OR")
+            # Dynamic Trigger Evaluation. Config-derived values are only
+            # re-read when config_version moves (startup and config POSTs);
+            # every other block skips the dict lookups and re-parsing.
+            if cfg_ver_seen != config_version["n"]:
+                cfg_ver_seen = config_version["n"]
+                triggers = analyzer_config.get("triggers") or ()
+                logic = analyzer_config.get("logic", "OR")
+                rebuild_trigger_arrays(triggers, logic)
+                storage_dir = analyzer_config.get("storageLocation", args.event_dir)
+                rec_length = analyzer_config.get("recLength", args.post)
+                prom_trig = analyzer_config.get("prominentTrigger", {})
+                prom_freq1 = prom_trig.get("freq1")
+                prom_freq2 = prom_trig.get("freq2")
+                prom_dur = prom_trig.get("duration", 0)
+                prom_freq_vals = []
+                try:
+                    if prom_freq1:
+                        prom_freq_vals.append(float(prom_freq1))
+                    if prom_freq2 and prom_freq2 != prom_freq1:
+                        prom_freq_vals.append(float(prom_freq2))
+                except:
+                    prom_freq_vals = []
             trigger_results = []
-            current_time = now_utc()
+            current_time = ts_now
             
             # Debug: Show 250Hz amplitude every 10 seconds
-            if not hasattr(start_event, 'last_amp_log'):
-                start_event.last_amp_log = 0
-            if time.time() - start_event.last_amp_log > 10:
-                if 250 in LA:
-                    print(f"[wp-audio] DEBUG: 250Hz amplitude = {LA[250]:.1f} dB(A), Triggers configured: {len(triggers)}", flush=True)
-                    if triggers:
-                        print(f"[wp-audio] DEBUG: Trigger config = {triggers}, Logic = {logic}", flush=True)
-                start_event.last_amp_log = time.time()
+            if DEBUG:
+                if not hasattr(start_event, 'last_amp_log'):
+                    start_event.last_amp_log = 0
+                if time.time() - start_event.last_amp_log > 10:
+                    if 250 in LA:
+                        log(f"[wp-audio] DEBUG: 250Hz amplitude = {LA[250]:.1f} dB(A), Triggers configured: {len(triggers)}")
+                        if triggers:
+                            log(f"[wp-audio] DEBUG: Trigger config = {triggers}, Logic = {logic}")
+                    start_event.last_amp_log = time.time()
             
             # Only evaluate triggers that are actually configured (freq or 'sum') and amp > 0
-            active_trigger_count = sum(1 for t in triggers if (t.get("freq") and t.get("amp", 0) > 0))
-
-            for trig in triggers:
-                freq = trig.get("freq")
-                amp = trig.get("amp", 0)
-                if freq and amp > 0:
-                    if freq == "sum":
-                        # ...existing code for 'sum' trigger...
-                        sum_level = latest_payload.get("sum_level")
-                        is_triggered = sum_level is not None and sum_level >= amp
-                        trigger_results.append(is_triggered)
-                        if is_triggered:
-                            print(f"[wp-audio] TRIGGER ACTIVATED: Summe @ {sum_level:.1f} dB (threshold {amp:.1f} dB)", flush=True)
-                        # ...existing code for state tracking...
-                        if is_triggered:
-                            if "sum" not in trigger_states:
-                                trigger_states["sum"] = {"start_time": current_time, "start_amp": sum_level}
-                                print(f"[wp-audio] Trigger ACTIVE: Summe @ {sum_level:.1f} dB (threshold {amp:.1f} dB)", flush=True)
-                        else:
-                            if "sum" in trigger_states:
-                                start_info = trigger_states["sum"]
-                                try:
-                                    from datetime import datetime
-                                    start_dt = datetime.fromisoformat(start_info["start_time"].replace('Z', '+00:00'))
-                                    end_dt = datetime.fromisoformat(current_time.replace('Z', '+00:00'))
-                                    duration = (end_dt - start_dt).total_seconds()
-                                except:
-                                    duration = 0.0
-                                log_entry = {
-                                    "time": start_info["start_time"],
-                                    "frequency": "sum",
-                                    "amplitude": round(start_info["start_amp"], 2),
-                                    "duration": round(duration, 2)
-                                }
-                                trigger_log.append(log_entry)
-                                print(f"[wp-audio] Trigger logged: Summe, {start_info['start_amp']:.1f} dB, {duration:.2f}s", flush=True)
-                                del trigger_states["sum"]
-                    else:
-                        try:
-                            freq_val = float(freq)
-                        except:
-                            continue
-                        if freq_val in LA:
-                            is_triggered = LA[freq_val] >= amp
-                            trigger_results.append(is_triggered)
-                            if is_triggered:
-                                print(f"[wp-audio] TRIGGER ACTIVATED: {freq_val}Hz @ {LA[freq_val]:.1f} dB (threshold {amp:.1f} dB)", flush=True)
-                        else:
-                            print(f"[wp-audio] WARNING: Trigger frequency {freq_val} Hz not found in current bands. Available: {sorted(LA.keys())}", flush=True)
-                        # ...existing code for state tracking...
-                        if is_triggered:
-                            if freq_val not in trigger_states:
-                                trigger_states[freq_val] = {"start_time": current_time, "start_amp": LA[freq_val]}
-                                print(f"[wp-audio] Trigger ACTIVE: {freq_val} Hz @ {LA[freq_val]:.1f} dB (threshold {amp:.1f} dB)", flush=True)
-                        else:
-                            if freq_val in trigger_states:
-                                start_info = trigger_states[freq_val]
-                                try:
-                                    from datetime import datetime
-                                    start_dt = datetime.fromisoformat(start_info["start_time"].replace('Z', '+00:00'))
-                                    end_dt = datetime.fromisoformat(current_time.replace('Z', '+00:00'))
-                                    duration = (end_dt - start_dt).total_seconds()
-                                except:
-                                    duration = 0.0
-                                log_entry = {
-                                    "time": start_info["start_time"],
-                                    "frequency": freq_val,
-                                    "amplitude": round(start_info["start_amp"], 2),
-                                    "duration": round(duration, 2)
-                                }
-                                trigger_log.append(log_entry)
-                                print(f"[wp-audio] Trigger logged: {freq_val} Hz, {start_info['start_amp']:.1f} dB, {duration:.2f}s", flush=True)
-                                del trigger_states[freq_val]
+            active_trigger_count = trig_cache["active_count"]
+
+            sum_thr = trig_cache["sum_thr"]
+            if sum_thr is not None:
+                sum_level = latest_payload.get("sum_level")
+                is_triggered = sum_level is not None and sum_level >= sum_thr
+                trigger_results.append(is_triggered)
+                if is_triggered:
+                    log(f"[wp-audio] TRIGGER ACTIVATED: Summe @ {sum_level:.1f} dB (threshold {sum_thr:.1f} dB)")
+                    if "sum" not in trigger_states:
+                        trigger_states["sum"] = {"start_time": current_time, "start_amp": sum_level}
+                        log(f"[wp-audio] Trigger ACTIVE: Summe @ {sum_level:.1f} dB (threshold {sum_thr:.1f} dB)")
+                elif "sum" in trigger_states:
+                    start_info = trigger_states["sum"]
+                    duration = trig_held_seconds(start_info["start_time"], current_time)
+                    log_entry = {
+                        "time": start_info["start_time"],
+                        "frequency": "sum",
+                        "amplitude": round(start_info["start_amp"], 2),
+                        "duration": round(duration, 2)
+                    }
+                    trigger_log.append(log_entry)
+                    log(f"[wp-audio] Trigger logged: Summe, {start_info['start_amp']:.1f} dB, {duration:.2f}s")
+                    del trigger_states["sum"]
+
+            band_idx = trig_cache["band_idx"]
+            if band_idx.size:
+                band_levels = la_arr[band_idx]
+                band_active = band_levels >= trig_cache["band_thr"]
+                band_thr = trig_cache["band_thr"]
+                for k, freq_val in enumerate(trig_cache["band_keys"]):
+                    is_triggered = bool(band_active[k])
+                    trigger_results.append(is_triggered)
+                    if is_triggered:
+                        log(f"[wp-audio] TRIGGER ACTIVATED: {freq_val}Hz @ {band_levels[k]:.1f} dB (threshold {band_thr[k]:.1f} dB)")
+                        if freq_val not in trigger_states:
+                            trigger_states[freq_val] = {"start_time": current_time, "start_amp": float(band_levels[k])}
+                            log(f"[wp-audio] Trigger ACTIVE: {freq_val} Hz @ {band_levels[k]:.1f} dB (threshold {band_thr[k]:.1f} dB)")
+                    elif freq_val in trigger_states:
+                        start_info = trigger_states[freq_val]
+                        duration = trig_held_seconds(start_info["start_time"], current_time)
+                        log_entry = {
+                            "time": start_info["start_time"],
+                            "frequency": freq_val,
+                            "amplitude": round(start_info["start_amp"], 2),
+                            "duration": round(duration, 2)
+                        }
+                        trigger_log.append(log_entry)
+                        log(f"[wp-audio] Trigger logged: {freq_val} Hz, {start_info['start_amp']:.1f} dB, {duration:.2f}s")
+                        del trigger_states[freq_val]
 
             # --- Prominent frequency trigger (No. 5) ---
-            prom_trig = analyzer_config.get("prominentTrigger", {})
-            prom_freq1 = prom_trig.get("freq1")
-            prom_freq2 = prom_trig.get("freq2")
-            prom_dur = prom_trig.get("duration", 0)
-            prom_freq_vals = []
-            try:
-                if prom_freq1:
-                    prom_freq_vals.append(float(prom_freq1))
-                if prom_freq2 and prom_freq2 != prom_freq1:
-                    prom_freq_vals.append(float(prom_freq2))
-            except:
-                prom_freq_vals = []
             if prom_freq_vals:
                 if not hasattr(main, "prominent_buffer") or main.prominent_buffer.maxlen != max(1, int(prom_dur/block_sec)):
                     main.prominent_buffer = deque(maxlen=max(1, int(prom_dur/block_sec)))
@@ -1300,7 +1825,7 @@ def main():
                 # Only trigger if it has been true for the whole duration
                 if len(main.prominent_buffer) == main.prominent_buffer.maxlen and all(main.prominent_buffer):
                     trigger_results.append(True)
-                    print(f"[wp-audio] TRIGGER ACTIVATED: Prominent frequency {prom_freq_vals} Hz for {prom_dur}s", flush=True)
+                    log(f"[wp-audio] TRIGGER ACTIVATED: Prominent frequency {prom_freq_vals} Hz for {prom_dur}s")
                 else:
                     trigger_results.append(False)
             
@@ -1313,92 +1838,88 @@ def main():
             else:  # OR (default)
                 trigger_event = any(trigger_results) if trigger_results else False
             
-            # Determine required hold duration from active triggers
-            # For AND logic: use maximum duration among all configured triggers
-            # For OR logic: use minimum duration among active triggers
-            required_duration = args.hold_sec  # fallback to default 2s
-            trigger_durations = [
-                trig.get("duration", 0)
-                for trig in triggers
-                if trig.get("amp", 0) > 0 and (
-                    (trig.get("freq") == "sum") or
-                    (trig.get("freq") and str(trig.get("freq")).replace('.', '', 1).isdigit())
-                )
-            ]
-            if trigger_durations:
-                if logic == "AND":
-                    required_duration = max(trigger_durations) if trigger_durations else args.hold_sec
-                else:  # OR
-                    required_duration = min([d for d in trigger_durations if d > 0]) if any(d > 0 for d in trigger_durations) else args.hold_sec
+            # Required hold duration is precomputed alongside the trigger
+            # arrays (AND: max of all triggers, OR: min non-zero).
+            required_duration = trig_cache["required_duration"]
             
             # Debug: show trigger evaluation result
-            if len(trigger_results) > 0 and not S["trig"]:
-                print(f"[wp-audio] Trigger results: {trigger_results}, Logic={logic}, Event={trigger_event}", flush=True)
-            if trigger_event and S["hold"] == 0:
-                print(f"[wp-audio] Trigger event started! Logic={logic}, Required duration: {required_duration}s", flush=True)
+            if DEBUG and len(trigger_results) > 0 and not S.trig:
+                log(f"[wp-audio] Trigger results: {trigger_results}, Logic={logic}, Event={trigger_event}")
+            if trigger_event and S.hold == 0:
+                log(f"[wp-audio] Trigger event started! Logic={logic}, Required duration: {required_duration}s")
             
-            # Use configured storage location and recording length
-            storage_dir = analyzer_config.get("storageLocation", args.event_dir)
-            rec_length = analyzer_config.get("recLength", args.post)
+            # storage_dir / rec_length come from the config_version block above
             
-            if not S["trig"]:
-                if trigger_event:
-                    if S["hold"] == 0:
-                        # Mark the index and time when the hold period starts
-                        S["hold_start_idx"] = len(pre_buf)
-                        S["hold_start_time"] = time.time()
-                    S["hold"]+=block_sec
-                    print(f"[wp-audio] Accumulating hold time: {S['hold']:.2f}s / {required_duration:.2f}s", flush=True)
-                    if S["hold"]>=required_duration:
-                        S["trig"]=True; S["post_left"]=args.post
+            if not S.trig:
+                if not trigger_event:
+                    # Common case: idle and quiet. Only touch the hold state
+                    # when there is actually something to clear.
+                    if S.hold:
+                        S.hold=0
+                        S.hold_start_idx = None
+                else:
+                    if S.hold == 0:
+                        # Mark the index where the hold period starts
+                        S.hold_start_idx = pre_count
+                    S.hold+=block_sec
+                    log(f"[wp-audio] Accumulating hold time: {S.hold:.2f}s / {required_duration:.2f}s")
+                    if S.hold>=required_duration:
+                        S.trig=True; S.post_left=args.post
                         # Calculate the start index for the event in the pre-buffer
-                        pre_buf_list = list(pre_buf)
+                        pre_buf_list = pre_snapshot()
                         spec_buf_list = list(spec_buf)
-                        # The event should start at (len(pre_buf) - int(args.pre/block_sec) + S["hold_start_idx"]) if possible
-                        event_audio = pre_buf_list[S["hold_start_idx"]:] if S["hold_start_idx"] is not None else pre_buf_list
-                        event_specs = spec_buf_list[S["hold_start_idx"]:] if S["hold_start_idx"] is not None else spec_buf_list
-                        S["cur_dir"]=os.path.join(storage_dir, now_utc()); os.makedirs(S["cur_dir"], exist_ok=True)
-                        S["event_audio"]=event_audio; S["event_specs"]=event_specs; S["peak80"]=-999.0; S["peak160"]=-999.0; S["overall_dbA"]=[]
-                        S["event_start_time"]=S["hold_start_time"] if S["hold_start_time"] is not None else time.time(); S["actual_duration"]=0; S["recording_stopped"]=False
-                        print(f"[wp-audio] Event START {S['cur_dir']} (Pre-buffer: {len(event_audio)} audio blocks, {len(event_specs)} spectrum blocks)")
-                        S["hold"]=0
-                        S["hold_start_idx"] = None
-                        S["hold_start_time"] = None
+                        # The event should start at the block where the hold period began, if possible
+                        event_audio = pre_buf_list[S.hold_start_idx:] if S.hold_start_idx is not None else pre_buf_list
+                        event_specs = spec_buf_list[S.hold_start_idx:] if S.hold_start_idx is not None else spec_buf_list
+                        S.cur_dir=os.path.join(storage_dir, now_utc()); os.makedirs(S.cur_dir, exist_ok=True)
+                        S.event_audio, S.ea_w = ea_alloc(event_audio)
+                        S.event_specs=event_specs; peaks.fill(-999.0); S.overall_dbA=np.zeros(0, np.float32); S.odba_w=0
+                        # Duration is counted in audio time (blocks *
+                        # block_sec), starting with the hold span already
+                        # elapsed; no wall-clock reads in the block path.
+                        S.actual_duration=S.hold; S.recording_stopped=False
+                        log(f"[wp-audio] Event START {S.cur_dir} (Pre-buffer: {len(event_audio)} audio blocks, {len(event_specs)} spectrum blocks)")
+                        S.hold=0
+                        S.hold_start_idx = None
                         # Clear post buffers at event start
                         post_buf_audio.clear()
                         post_buf_spec.clear()
-                else:
-                    S["hold"]=0
-                    S["hold_start_idx"] = None
-                    S["hold_start_time"] = None
             else:
-                # Track actual event duration
-                S["actual_duration"] = time.time() - S["event_start_time"] if S["event_start_time"] is not None else 0
+                # Each state field is pulled out of S once per block; the
+                # read-modify-write pairs below otherwise hash the same keys
+                # twice per block for the lifetime of the event.
+                actual_duration = S.actual_duration + block_sec
+                S.actual_duration = actual_duration
                 # Always append to event buffers during event
-                S["event_audio"].append(x.copy()); S["event_specs"].append(rec)
-                S["peak80"]=max(S["peak80"],la80); S["peak160"]=max(S["peak160"],la160)
-                # Calculate overall dB(A) from all frequency bands (energy sum)
-                total_energy = sum(10**(la/10) for la in LA.values())
-                overall_dbA = 10 * np.log10(total_energy) if total_energy > 0 else 0.0
-                S["overall_dbA"].append(overall_dbA)
-                # If trigger ended, start/continue post-buffering
-                if not trigger_event:
-                    S["post_left"]-=block_sec
+                ea_append(x); S.event_specs.append(rec)
+                np.maximum(peaks, la_arr, out=peaks)  # in-place per-band peak hold
+                # Overall dB(A) = energy sum over the bands, done as a
+                # logsumexp so extreme levels can neither overflow nor
+                # underflow the intermediate energies
+                overall_dbA = float(logsumexp(la_arr * LN10_10)) / LN10_10
+                odba_append(overall_dbA)
+                # Trigger still active is the common case while recording:
+                # just keep the post timer topped up and move on.
+                if trigger_event:
+                    S.post_left=args.post
+                else:
+                    # Trigger ended: run down the post timer
+                    post_left = S.post_left - block_sec
+                    S.post_left = post_left
                     # Append all post-buffer data when post buffer is full or post_left <= 0
-                    if S["post_left"] <= 0:
+                    if post_left <= 0:
                         # Append the entire post buffer to the event
-                        S["event_audio"].extend(list(post_buf_audio))
-                        S["event_specs"].extend(list(post_buf_spec))
-                        if not S["recording_stopped"]:
-                            print(f"[wp-audio] DEBUG: Trigger ended, calling end_event, cur_dir={S['cur_dir']}, actual_duration={S['actual_duration']:.1f}s", flush=True)
+                        for blk in post_buf_audio:
+                            ea_append(blk)
+                        S.event_specs.extend(list(post_buf_spec))
+                        if not S.recording_stopped:
+                            if DEBUG:
+                                log(f"[wp-audio] DEBUG: Trigger ended, calling end_event, cur_dir={S.cur_dir}, actual_duration={actual_duration:.1f}s")
                             end_event(current_fs)
                         else:
-                            print(f"[wp-audio] Event tracking ended. Total duration: {S['actual_duration']:.1f}s", flush=True)
-                            S["trig"]=False; S["hold"]=0
+                            log(f"[wp-audio] Event tracking ended. Total duration: {actual_duration:.1f}s")
+                            S.trig=False; S.hold=0
                     # Otherwise, keep filling the post buffer
-                else:
-                    # Trigger still active, reset post timer
-                    S["post_left"]=args.post
 
     finally:
         try: